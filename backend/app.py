@@ -1,5 +1,7 @@
 from flask import Flask, jsonify, request
 from config import supabase
+import question_bank
+import auth
 from flask_cors import CORS 
 import os
 import json
@@ -8,7 +10,9 @@ CORS(app, origins="*")
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+import shutil
 import subprocess
+import tempfile
 
 @app.route('/')
 def hello_world():
@@ -70,6 +74,8 @@ def login():
         expires_in = getattr(response.session, "expires_in", None)
 
         metadata = getattr(response.user, "user_metadata", None)
+        # Warm the metadata cache so role checks on this user's requests skip the auth service
+        auth.remember_user(user_id, metadata)
 
 
         return jsonify({
@@ -88,6 +94,7 @@ def login():
 
 
 @app.route('/upload_pdf', methods=['POST'])
+@auth.require_role(*auth.UPLOAD_ROLES)
 def upload_pdf():
     try:
         # Get the file from the request (the field name should match what the client uses)
@@ -115,6 +122,7 @@ def upload_pdf():
 
 
 @app.route('/upload_image', methods=['POST'])
+@auth.require_role(*auth.UPLOAD_ROLES)
 def upload_image():
     try:
         # Get the file from the request (the field name should match what the client uses)
@@ -143,6 +151,7 @@ def upload_image():
     
 
 @app.route('/upload_video', methods=['POST'])
+@auth.require_role(*auth.UPLOAD_ROLES)
 def upload_video():
     try:
         # Get the file from the request (the field name should match what the client uses)
@@ -228,6 +237,7 @@ def get_pdfs():
 
 # Endpoint to process a PDF and generate questions/answers
 @app.route('/process_homework_pdf', methods=['POST'])
+@auth.require_role(*auth.UPLOAD_ROLES)
 def process_homework_pdf():
     try:
         # Get the PDF filename from the request (should match what was uploaded)
@@ -242,21 +252,65 @@ def process_homework_pdf():
         if not os.path.exists(pdf_path):
             return jsonify({'error': 'PDF file not found'}), 404
 
-        # Run main.py with the PDF (assumes main.py uses the correct PDF path)
-        result = subprocess.run(
-            ['python3', os.path.join(autogen_dir, 'main.py'), pdf_path],
-            capture_output=True, text=True
-        )
-        logger.info(result)
-        if result.returncode != 0:
-            return jsonify({'error': 'Processing failed', 'details': result.stderr}), 500
-
-        # After processing, return the generated final.json
-        final_json_path = os.path.join(autogen_dir, 'final.json')
-        if not os.path.exists(final_json_path):
-            return jsonify({'error': 'No results found'}), 500
-        with open(final_json_path, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        # Only re-run extraction and classification for pages that changed since the last run
+        fingerprints = question_bank.page_fingerprints(pdf_path)
+        stored = question_bank.load_pages(pdf_filename)
+        changed = question_bank.changed_pages(stored, fingerprints)
+
+        if changed:
+            # Each run writes to its own directory so concurrent runs can't mix up each other's final.json.
+            # Extracted images are uploaded to storage, so the directory is deleted once the run is saved.
+            output_dir = tempfile.mkdtemp(prefix=f"{os.path.splitext(os.path.basename(pdf_filename))[0]}-")
+            try:
+                # Run main.py with the PDF, the pages to regenerate and the output directory
+                result = subprocess.run(
+                    ['python3', os.path.join(autogen_dir, 'main.py'), pdf_path, ','.join(map(str, changed)), output_dir],
+                    capture_output=True, text=True
+                )
+                logger.info(result)
+                if result.returncode != 0:
+                    return jsonify({'error': 'Processing failed', 'details': result.stderr}), 500
+
+                # After processing, read the generated final.json
+                final_json_path = os.path.join(output_dir, 'final.json')
+                if not os.path.exists(final_json_path):
+                    return jsonify({'error': 'No results found'}), 500
+                with open(final_json_path, 'r', encoding='utf-8') as f:
+                    generated = {question['page']: question for question in json.load(f)}
+
+                question_bank.upload_question_images(pdf_filename, fingerprints, generated)
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+            rows = question_bank.save_pages(pdf_filename, fingerprints, generated, changed)
+            question_bank.delete_question_images([stored[page] for page in changed if page in stored])
+            stored.update({row['page']: row for row in rows})
+        logger.info(f"{pdf_filename}: regenerated pages {changed} of {len(fingerprints)}")
+
+        # An edited PDF may only have lost pages, with nothing to regenerate
+        removed = [row for page, row in stored.items() if page not in fingerprints]
+        if removed:
+            question_bank.delete_pages_after(pdf_filename, len(fingerprints))
+            question_bank.delete_question_images(removed)
+
+        stored = {page: row for page, row in stored.items() if page in fingerprints}
+        results = question_bank.stored_questions(stored)
+        return jsonify({'success': True, 'results': results}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Endpoint to read the stored questions of a processed PDF without re-running the pipeline
+@app.route('/get_homework_questions', methods=['GET'])
+def get_homework_questions():
+    try:
+        pdf_filename = request.args.get('pdf_filename')
+        if not pdf_filename:
+            return jsonify({'error': 'No PDF filename provided'}), 400
+
+        stored = question_bank.load_pages(pdf_filename)
+        if not stored:
+            return jsonify({'error': 'No questions found'}), 404
+        results = question_bank.stored_questions(stored)
         return jsonify({'success': True, 'results': results}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import jwt
+from flask import g, jsonify, request
+from config import SUPABASE_JWT_SECRET, SUPABASE_URL
+
+JWKS_URL = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+JWKS_TTL = 600  # Seconds before the signing keys are fetched again
+JWKS_REFRESH_INTERVAL = 30  # Minimum seconds between refetches triggered by an unknown key id
+FAILED_KEY_TTL = 30  # Seconds a key id that could not be loaded is rejected without a lookup
+TOKEN_CACHE_SIZE = 4096
+USER_CACHE_SIZE = 4096
+USER_CACHE_TTL = 300  # Seconds before a user's metadata is considered stale
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+# Roles allowed to upload documents and generate homework questions
+UPLOAD_ROLES = ("teacher", "ngo", "admin")
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# Verified token -> claims, kept until the token expires
+token_cache = TTLCache(TOKEN_CACHE_SIZE, ttl=JWKS_TTL)
+# User id -> user_metadata (role, school, xp, ...)
+user_cache = TTLCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# Key id -> error message of signing keys that could not be loaded
+failed_keys = TTLCache(TOKEN_CACHE_SIZE, ttl=FAILED_KEY_TTL)
+# Created lazily so importing this module never touches the network
+_jwks_client = None
+_jwks_lock = threading.Lock()
+_last_jwks_refresh = 0.0
+
+
+def get_jwks_client():
+    global _jwks_client
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(JWKS_URL, cache_keys=True, lifespan=JWKS_TTL)
+    return _jwks_client
+
+
+def get_signing_key(token):
+    """Public key of an asymmetric token, refetching the key set at most every JWKS_REFRESH_INTERVAL
+
+    Tokens signed with an unknown or unreachable key would otherwise refetch the key set on every request.
+    """
+    global _last_jwks_refresh
+    kid = jwt.get_unverified_header(token).get("kid")
+    if not kid:
+        raise jwt.PyJWKClientError("Token has no key id")
+    error = failed_keys.get(kid)
+    if error is not None:
+        raise jwt.PyJWKClientError(error)
+
+    client = get_jwks_client()
+    try:
+        with _jwks_lock:
+            signing_key = client.match_kid(client.get_signing_keys(), kid)
+            if signing_key is None and time.monotonic() - _last_jwks_refresh >= JWKS_REFRESH_INTERVAL:
+                # The keys may have been rotated since they were cached
+                _last_jwks_refresh = time.monotonic()
+                signing_key = client.match_kid(client.get_signing_keys(refresh=True), kid)
+        if signing_key is None:
+            raise jwt.PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+    except jwt.PyJWKClientError as e:
+        failed_keys.set(kid, str(e))
+        raise
+    return signing_key.key
+
+
+def verify_token(token):
+    """Validate a Supabase access token locally and return its claims
+
+    Raises a jwt.PyJWTError if the token is not valid or its signing key cannot be loaded.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    algorithm = jwt.get_unverified_header(token).get("alg")
+    if algorithm == "HS256" and SUPABASE_JWT_SECRET:
+        key = SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        key = get_signing_key(token)
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience="authenticated",
+        options={"require": ["exp", "sub"]},
+    )
+    token_cache.set(token, claims, ttl=claims["exp"] - time.time())
+    if user_cache.get(claims["sub"]) is None:
+        remember_user(claims["sub"], claims.get("user_metadata"))
+    return claims
+
+
+def remember_user(user_id, metadata):
+    """Cache a user's metadata, e.g. straight from the /login response"""
+    if user_id:
+        user_cache.set(user_id, metadata or {})
+
+
+def get_user_metadata(claims):
+    metadata = user_cache.get(claims["sub"])
+    if metadata is None:
+        metadata = claims.get("user_metadata") or {}
+        remember_user(claims["sub"], metadata)
+    return metadata
+
+
+def get_bearer_token():
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+def require_role(*roles):
+    """Reject requests without a valid access token, or whose user role is not in `roles`
+
+    The verified claims and metadata are available to the view as g.claims and g.user_metadata.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = get_bearer_token()
+            if not token:
+                return jsonify({"error": "Missing access token"}), 401
+            try:
+                claims = verify_token(token)
+            except jwt.PyJWTError as e:
+                return jsonify({"error": f"Invalid access token: {str(e)}"}), 401
+
+            metadata = get_user_metadata(claims)
+            if roles and metadata.get("role") not in roles:
+                return jsonify({"error": "Permission denied"}), 403
+
+            g.claims = claims
+            g.user_metadata = metadata
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import unicodedata
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "distractors.db")
+WRONG_ANS_COUNT = 3
+
+# Scoring weights of the local generator
+SAME_CATEGORY_BONUS = 0.5
+SAME_FIRST_LETTER_BONUS = 0.3
+SAME_SOUND_BONUS = 0.2
+LENGTH_PENALTY = 0.05  # Per letter of difference
+
+# Vocabulary that keeps coming back in kindergarten worksheets, grouped so wrong answers stay on topic
+LEXICON = {
+    "animals": ["ant", "bear", "bee", "bird", "cat", "cow", "crab", "deer", "dog", "donkey", "duck",
+                "elephant", "fish", "fox", "frog", "goat", "hen", "hippo", "horse", "lion", "monkey",
+                "mouse", "owl", "panda", "pig", "rabbit", "sheep", "snake", "tiger", "turtle", "zebra"],
+    "fruit": ["apple", "banana", "blueberry", "cherry", "grape", "kiwi", "lemon", "mango", "melon",
+              "orange", "peach", "pear", "pineapple", "plum", "strawberry", "watermelon"],
+    "food": ["bread", "cake", "candy", "carrot", "cheese", "cookie", "corn", "egg", "juice", "milk",
+             "noodles", "pizza", "rice", "soup", "tomato", "water"],
+    "household": ["bag", "bed", "bell", "bowl", "box", "brush", "chair", "clock", "cup", "door", "fan",
+                  "fork", "key", "lamp", "mirror", "phone", "plate", "sofa", "spoon", "table", "towel",
+                  "tv", "window"],
+    "school": ["book", "crayon", "desk", "eraser", "glue", "map", "notebook", "paper", "pen", "pencil",
+               "ruler", "scissors", "teacher"],
+    "clothes": ["boots", "cap", "coat", "dress", "gloves", "hat", "jacket", "shirt", "shoes", "skirt",
+                "socks", "sweater"],
+    "body": ["arm", "ear", "eye", "face", "foot", "hair", "hand", "head", "knee", "leg", "mouth", "nose",
+             "tooth"],
+    "colours": ["black", "blue", "brown", "green", "grey", "orange", "pink", "purple", "red", "white",
+                "yellow"],
+    "numbers": ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"],
+    "vehicles": ["bike", "boat", "bus", "car", "plane", "ship", "taxi", "train", "truck"],
+    "nature": ["cloud", "flower", "grass", "leaf", "moon", "rain", "rainbow", "river", "sea", "snow",
+               "star", "sun", "tree"],
+    "actions": ["clap", "climb", "cry", "dance", "draw", "drink", "eat", "jump", "kick", "read", "run",
+                "sing", "sit", "sleep", "swim", "walk", "write"],
+}
+
+DISTRACTOR_PROMPT = ("The following are answers to \"read images\" questions in an English course for "
+                     "kindergarten kids. For each word, generate 3 similar words as wrong answers. The "
+                     "wrong answers should be easy enough for kindergarten kids. You should #only# output "
+                     "a json format string mapping each word to its list of wrong answers.\n"
+                     "e.g. output: {\"orange\": [\"apple\", \"blueberry\", \"peach\"], "
+                     "\"horse\": [\"hippo\", \"dog\", \"donkey\"]}\n"
+                     "The words are:")
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for letter in letters}
+
+
+def normalize(word):
+    """Cache key of an answer: ligatures expanded, lower case, no trailing punctuation"""
+    return unicodedata.normalize("NFKC", word).strip().strip(".,!?;:").lower()
+
+
+def soundex(word):
+    """Four-character phonetic key, so that e.g. "cat" and "kite" sound alike"""
+    letters = [c for c in word if c.isalpha()]
+    if not letters:
+        return ""
+    codes = [SOUNDEX_CODES.get(c, "0") for c in letters]
+    key = [letters[0].upper()]
+    for previous, code in zip(codes, codes[1:]):
+        if code != "0" and code != previous:
+            key.append(code)
+    return "".join(key + ["0"] * 3)[:4]
+
+
+def bigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def similarity(word, candidate):
+    """Letter overlap (bigram Dice), shared first letter and sound, penalized by length difference"""
+    a, b = bigrams(word), bigrams(candidate)
+    score = 2 * len(a & b) / (len(a) + len(b))
+    if word[0] == candidate[0]:
+        score += SAME_FIRST_LETTER_BONUS
+    if soundex(word)[1:] == soundex(candidate)[1:]:
+        score += SAME_SOUND_BONUS
+    return score - LENGTH_PENALTY * abs(len(word) - len(candidate))
+
+
+def build_prompt(words):
+    return f"{DISTRACTOR_PROMPT} {json.dumps(words, ensure_ascii=False)}"
+
+
+class DistractorService:
+    """Wrong answers for "read images" questions: cached sets first, then the local generator
+
+    Answers that are neither cached nor in LEXICON are reported as unseen, so the caller
+    can ask the LLM for them and store the result with remember().
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS distractors ("
+            "right_ans TEXT PRIMARY KEY, "
+            "wrong_ans TEXT NOT NULL, "
+            "source TEXT NOT NULL, "
+            "updated_at TEXT NOT NULL)"
+        )
+        self.conn.commit()
+        # Word -> its LEXICON categories; a word like "orange" is both a fruit and a colour
+        self.categories = {}
+        for category, words in LEXICON.items():
+            for word in words:
+                self.categories.setdefault(word, set()).add(category)
+
+    def lookup(self, words):
+        """Cached wrong answers of `words`, keyed by normalized answer"""
+        keys = list({normalize(word) for word in words})
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" * len(keys))
+        rows = self.conn.execute(
+            f"SELECT right_ans, wrong_ans FROM distractors WHERE right_ans IN ({placeholders})", keys)
+        return {right_ans: json.loads(wrong_ans) for right_ans, wrong_ans in rows}
+
+    def remember(self, answers, source):
+        """Store right answer -> wrong answers sets, skipping values that are not lists of words"""
+        updated_at = datetime.now(timezone.utc).isoformat()
+        rows = [(normalize(right_ans), json.dumps(wrong_ans[:WRONG_ANS_COUNT], ensure_ascii=False), source, updated_at)
+                for right_ans, wrong_ans in answers.items()
+                if isinstance(right_ans, str) and right_ans and isinstance(wrong_ans, list) and wrong_ans
+                and all(isinstance(word, str) and word for word in wrong_ans)]
+        self.conn.executemany(
+            "INSERT INTO distractors (right_ans, wrong_ans, source, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(right_ans) DO UPDATE SET wrong_ans = excluded.wrong_ans, "
+            "source = excluded.source, updated_at = excluded.updated_at", rows)
+        self.conn.commit()
+
+    def remember_responses(self, llm_response):
+        """Keep the wrong answers the LLM generated for whole "read images" pages"""
+        answers = {}
+        for page in llm_response:
+            if page.get("question_type") != "read images":
+                continue
+            for item in page.get("content", []):
+                if isinstance(item, dict) and item.get("wrong_ans"):
+                    answers[item["right_ans"]] = item["wrong_ans"]
+        self.remember(answers, source="llm")
+
+    def generate(self, word):
+        """Local wrong answers for a LEXICON word, or None if the word is unknown"""
+        key = normalize(word)
+        categories = self.categories.get(key)
+        if categories is None:
+            return None
+        scored = []
+        for candidate, candidate_categories in self.categories.items():
+            # Plurals, substrings and superstrings (notebook -> book) could also be right answers
+            if candidate.rstrip("s") == key.rstrip("s") or candidate in key or key in candidate:
+                continue
+            score = similarity(key, candidate)
+            if candidate_categories & categories:
+                score += SAME_CATEGORY_BONUS
+            scored.append((-score, candidate))
+        return [candidate for _, candidate in sorted(scored)[:WRONG_ANS_COUNT]]
+
+    def resolve(self, words):
+        """Return (wrong answers by normalized word, unseen words)"""
+        resolved = self.lookup(words)
+        generated = {}
+        unseen = []
+        for word in words:
+            key = normalize(word)
+            if key in resolved or key in generated:
+                continue
+            wrong_ans = self.generate(key)
+            if wrong_ans:
+                generated[key] = wrong_ans
+            elif key and key not in unseen:
+                unseen.append(key)
+        self.remember(generated, source="local")
+        resolved.update(generated)
+        return resolved, unseen
+
+    def get(self, word):
+        """Wrong answers for one word, [] if it is neither cached nor known locally"""
+        resolved, _ = self.resolve([word])
+        return resolved.get(normalize(word), [])
+
+    def close(self):
+        self.conn.close()
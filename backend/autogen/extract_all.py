@@ -3,12 +3,31 @@ import json
 import argparse
 import fitz  # PyMuPDF
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+MIN_REGION_SIZE = 20  # Ignore drawings smaller than this (points), e.g. underlines and tick boxes
+MAX_REGION_RATIO = 0.8  # Ignore drawings covering most of the page, e.g. page borders
+CAPTION_DISTANCE = 50  # Max gap between a region and the word below it (same as question_type.THRESHOLD)
+
+def render_page(pdf_path, page_num, dpi, render_path):
+    """Rasterize a single page to PNG (runs in a worker process)"""
+    doc = fitz.open(pdf_path)
+    pix = doc.load_page(page_num).get_pixmap(dpi=dpi)
+    pix.save(render_path)
+    doc.close()
+    return page_num, render_path
 
 class PDFImageExtractor:
-    def __init__(self, pdf_path, output_dir):
+    def __init__(self, pdf_path, output_dir, render_dpi=None, render_workers=None, pages=None):
         self.pdf_path = pdf_path
         self.output_dir = output_dir
+        # 1-based page numbers to extract, None extracts every page
+        self.pages = pages
         self.extraction_results = []
+        # Rendered-page fallback for vector drawings and inline images, disabled when render_dpi is None
+        self.render_dpi = render_dpi
+        self.render_workers = render_workers
+        self.page_renders = {}
     
     def get_image_coordinates(self, page, xref):
         """Extract image coordinates by searching through the page's content"""
@@ -32,9 +51,100 @@ class PDFImageExtractor:
                 return [rect.x0, rect.y0, rect.x1, rect.y1]
         except:
             pass
+
+        # Last resort: image placement info also covers images drawn through forms
+        for info in page.get_image_info(xrefs=True):
+            if info.get("xref") == xref:
+                return list(info["bbox"])
         
         return None
 
+    def find_render_regions(self, page, image_coords):
+        """Find vector drawings and inline images sitting above a word on the page"""
+        page_area = abs(page.rect)
+        candidates = []
+
+        # Inline images are not listed by page.get_images() and have no xref
+        for info in page.get_image_info(xrefs=True):
+            if info.get("xref") == 0:
+                candidates.append(fitz.Rect(info["bbox"]))
+
+        try:
+            candidates.extend(page.cluster_drawings())
+        except Exception as e:
+            print(f"Error clustering drawings: {str(e)}")
+
+        # Single words, since captions sharing a baseline are merged into one text block
+        words = [fitz.Rect(w[:4]) for w in page.get_text("words") if w[4].strip()]
+        extracted = [fitz.Rect(c) for c in image_coords if c]
+
+        regions = []
+        for rect in candidates:
+            if rect.width < MIN_REGION_SIZE or rect.height < MIN_REGION_SIZE:
+                continue
+            if abs(rect) > MAX_REGION_RATIO * page_area:
+                continue
+            # Skip frames around pictures we already extracted
+            if any(rect.intersects(img) for img in extracted):
+                continue
+            if any(r.contains(rect) for r in regions):
+                continue
+            has_caption = any(
+                rect.x0 <= (word.x0 + word.x1) / 2 <= rect.x1 and
+                0 <= word.y0 - rect.y1 < CAPTION_DISTANCE
+                for word in words
+            )
+            if has_caption:
+                regions.append(rect)
+        return regions
+
+    def render_pages(self, page_nums):
+        """Rasterize pages once per document at render_dpi, in parallel across pages"""
+        pending = []
+        for page_num in page_nums:
+            if page_num in self.page_renders:
+                continue
+            render_path = os.path.join(self.output_dir, f"page_{page_num+1}_render_{self.render_dpi}dpi.png")
+            pending.append((page_num, render_path))
+
+        if len(pending) == 1:
+            page_num, render_path = render_page(self.pdf_path, pending[0][0], self.render_dpi, pending[0][1])
+            self.page_renders[page_num] = render_path
+        elif pending:
+            with ProcessPoolExecutor(max_workers=self.render_workers) as executor:
+                futures = [executor.submit(render_page, self.pdf_path, page_num, self.render_dpi, render_path)
+                           for page_num, render_path in pending]
+                for future in futures:
+                    page_num, render_path = future.result()
+                    self.page_renders[page_num] = render_path
+
+    def crop_rendered_regions(self, page_num, regions):
+        """Crop regions out of the cached page render and save them as images"""
+        page_pix = fitz.Pixmap(self.page_renders[page_num])
+        scale = self.render_dpi / 72
+        crops = []
+
+        for region_index, rect in enumerate(regions):
+            irect = (rect * fitz.Matrix(scale, scale)).irect & page_pix.irect
+            if irect.is_empty:
+                continue
+            crop = fitz.Pixmap(page_pix.colorspace, irect, page_pix.alpha)
+            crop.copy(page_pix, irect)
+
+            image_filename = f"page_{page_num+1}_render_{region_index+1}.png"
+            image_path = os.path.join(self.output_dir, image_filename)
+            crop.save(image_path)
+
+            crops.append({
+                "filename": image_filename,
+                "path": image_path,
+                "format": "png",
+                "size": os.path.getsize(image_path),
+                "coordinates": [rect.x0, rect.y0, rect.x1, rect.y1],
+                "xref": 0
+            })
+        return crops
+
     def extract_text_content(self, page):
         """Extract text content from the page with coordinates"""
         try:
@@ -114,9 +224,12 @@ class PDFImageExtractor:
             extracted_image_count = 0
             
             print(f"Total pages: {total_pages}")
+            render_regions = {}
             
             # Iterate through each page
             for page_num in range(total_pages):
+                if self.pages and page_num + 1 not in self.pages:
+                    continue
                 page = doc.load_page(page_num)
                 
                 # Extract text content from the page
@@ -165,6 +278,11 @@ class PDFImageExtractor:
                         page_images.append(image_data)
                         page_coordinates.append(image_coords)
                 
+                if self.render_dpi:
+                    regions = self.find_render_regions(page, page_coordinates)
+                    if regions:
+                        render_regions[page_num] = regions
+
                 # Add page results to the main list
                 page_result = {
                     "page": page_num + 1,
@@ -181,6 +299,20 @@ class PDFImageExtractor:
                       f"{len(page_images)} images, {len(text_content)} text blocks")
             
             doc.close()
+
+            # Crop vector drawings and inline images out of the rendered pages
+            if render_regions:
+                print(f"Rendering {len(render_regions)} pages at {self.render_dpi} dpi")
+                self.render_pages(render_regions.keys())
+                results_by_page = {page_result["page"]: page_result for page_result in results}
+                for page_num, regions in render_regions.items():
+                    crops = self.crop_rendered_regions(page_num, regions)
+                    page_result = results_by_page[page_num + 1]
+                    page_result["images"].extend(crops)
+                    page_result["coordinates"].extend(crop["coordinates"] for crop in crops)
+                    page_result["image_links"].extend(crop["path"] for crop in crops)
+                    extracted_image_count += len(crops)
+
             self.extraction_results = results
             
             # Generate JSON output
@@ -254,7 +386,9 @@ class PDFImageExtractor:
                 text_info.append({
                     "text": block["text"],
                     "coordinates": block["bbox"],
-                    "line_count": len(block.get("lines", []))
+                    "line_count": len(block.get("lines", [])),
+                    "lines": [{"text": line["text"], "coordinates": line["bbox"]}
+                              for line in block.get("lines", [])]
                 })
             
             json_output.append({
@@ -272,7 +406,7 @@ class PDFImageExtractor:
         
         return json_path
 
-def main(pdf, output):
+def main(pdf, output, render_dpi=None, pages=None):
     
     # Validate PDF file exists
     if not os.path.exists(pdf):
@@ -285,7 +419,7 @@ def main(pdf, output):
     
     try:
         # Create extractor instance and process PDF
-        extractor = PDFImageExtractor(pdf, output)
+        extractor = PDFImageExtractor(pdf, output, render_dpi=render_dpi, pages=pages)
         results = extractor.extract_images()
         
         # Print summary
@@ -2,59 +2,128 @@ import extract_all
 import json
 import question_type
 import preprocess_llm
+import preclassify
+import distractors
 import os
 import sys
 
 # Use the current script directory as BASE_DIR for portability
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Accept PDF path as argument, fallback to default
-if len(sys.argv) > 1:
-    PDF_PATH = sys.argv[1]
-else:
-    PDF_PATH = os.path.join(BASE_DIR, "homework.pdf")
-
 PROMPT_PATH = os.path.join(BASE_DIR, "prompt.txt")
-EXTRACTED_DATA_PATH = os.path.join(BASE_DIR, "extracted_results", "extracted_results.json")
-LLM_PREPROCESS_PATH = os.path.join(BASE_DIR, "llm_preprocess.json")
-LLM_RESPONSE_PATH = os.path.join(BASE_DIR, "llm_response.json")
-FINAL_OUTPUT_PATH = os.path.join(BASE_DIR, "final.json")
-
-with open(f"{BASE_DIR}/deepseek_api_key", 'r') as file:
-    api_key = file.read()
-
-extract_all.main(pdf=PDF_PATH, output=f"{BASE_DIR}/extracted_results")
-preprocess_llm.main(extracted_data_file=EXTRACTED_DATA_PATH, output_file=LLM_PREPROCESS_PATH)
+RENDER_DPI = 150  # Rasterize pages to pick up vector-drawn and inline pictures, None to disable
+# PRECLASSIFY=0 sends every page to the LLM, e.g. to load test the LLM path
+PRECLASSIFY = os.getenv("PRECLASSIFY", "1") != "0"
 
-with open(PROMPT_PATH, 'r') as file:
-    prompt = file.read()
-
-with open(LLM_PREPROCESS_PATH, 'r') as file:
-    extraction_results = str(json.load(file))
-
-prompt += extraction_results
+# DEEPSEEK_BASE_URL / DEEPSEEK_API_KEY let the pipeline run against a local stand-in (see backend/loadtest)
+LLM_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 
 # Please install OpenAI SDK first: `pip3 install openai`
 
-from openai import OpenAI
-
-print("Sending request to LLM...")
-
-client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-
-response = client.chat.completions.create(
-    model="deepseek-chat",
-    messages=[
-        {"role": "system", "content": "You are a helpful assistant"},
-        {"role": "user", "content": prompt},
-    ],
-    stream=False
-)
-
-print("Response received from LLM.")
-
-with open(LLM_RESPONSE_PATH, 'w', encoding='utf-8') as f:
-    resp = json.loads(response.choices[0].message.content)
-    json.dump(resp, f, ensure_ascii=False, indent=4)
-
-question_type.main(LLM_RESPONSE_PATH, EXTRACTED_DATA_PATH, FINAL_OUTPUT_PATH)
\ No newline at end of file
+def ask_llm(prompt, api_key):
+    from openai import OpenAI
+
+    client = OpenAI(api_key=api_key, base_url=LLM_BASE_URL)
+
+    response = client.chat.completions.create(
+        model="deepseek-chat",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant"},
+            {"role": "user", "content": prompt},
+        ],
+        stream=False
+    )
+
+    print("Response received from LLM.")
+    if response.usage:
+        print(f"LLM usage: {response.usage.prompt_tokens} prompt and {response.usage.completion_tokens} completion tokens")
+    return json.loads(response.choices[0].message.content)
+
+
+def main():
+    # Accept PDF path as argument, fallback to default
+    if len(sys.argv) > 1:
+        pdf_path = sys.argv[1]
+    else:
+        pdf_path = os.path.join(BASE_DIR, "homework.pdf")
+
+    # Optional comma-separated page numbers to (re)process, e.g. "2,5"; all pages by default
+    if len(sys.argv) > 2:
+        pages = [int(page) for page in sys.argv[2].split(",")]
+    else:
+        pages = None
+
+    # Optional directory for this run's files, so concurrent runs don't overwrite each other; BASE_DIR by default
+    if len(sys.argv) > 3:
+        output_dir = sys.argv[3]
+    else:
+        output_dir = BASE_DIR
+
+    extracted_dir = os.path.join(output_dir, "extracted_results")
+    extracted_data_path = os.path.join(extracted_dir, "extracted_results.json")
+    llm_preprocess_path = os.path.join(output_dir, "llm_preprocess.json")
+    llm_response_path = os.path.join(output_dir, "llm_response.json")
+    preclassified_path = os.path.join(output_dir, "preclassified.json")
+    final_output_path = os.path.join(output_dir, "final.json")
+
+    api_key = os.getenv("DEEPSEEK_API_KEY")
+    if not api_key:
+        with open(f"{BASE_DIR}/deepseek_api_key", 'r') as file:
+            api_key = file.read()
+
+    extract_all.main(pdf=pdf_path, output=extracted_dir, render_dpi=RENDER_DPI, pages=pages)
+    preprocess_llm.main(extracted_data_file=extracted_data_path, output_file=llm_preprocess_path)
+
+    # Pages whose question type is obvious from the layout skip the LLM
+    if PRECLASSIFY:
+        local_responses, llm_pages = preclassify.main(extracted_data_path, llm_preprocess_path, preclassified_path)
+    else:
+        print("Pre-classification disabled, sending every page to the LLM")
+        with open(llm_preprocess_path, 'r') as file:
+            local_responses, llm_pages = [], json.load(file)
+
+    with open(PROMPT_PATH, 'r') as file:
+        prompt = file.read()
+
+    resp = []
+    if not llm_pages:
+        print(f"All pages pre-classified, skipping LLM request (~{preclassify.estimate_tokens(prompt)} more prompt tokens saved).")
+    else:
+        prompt += str(llm_pages)
+        print(f"Sending request to LLM for {len(llm_pages)} pages...")
+        resp = ask_llm(prompt, api_key)
+
+    # Wrong answers come from the cache or the local generator; the LLM is only asked about new answers
+    distractor_service = distractors.DistractorService()
+    distractor_service.remember_responses(resp)
+
+    right_answers = [item['right_ans'] for page in local_responses if page['question_type'] == "read images"
+                     for item in page['content']]
+    _, unseen = distractor_service.resolve(right_answers)
+    print(f"Wrong answers for {len(right_answers) - len(unseen)}/{len(right_answers)} pre-classified answers found locally")
+    if unseen:
+        print(f"Sending request to LLM for wrong answers of {len(unseen)} new words...")
+        from openai import OpenAIError
+
+        # Wrong answers are optional, the questions are still generated without them
+        try:
+            answers = ask_llm(distractors.build_prompt(unseen), api_key)
+        except (ValueError, OpenAIError) as e:
+            print(f"Wrong answers request failed, leaving them empty: {e}")
+            answers = {}
+        if isinstance(answers, dict):
+            distractor_service.remember(answers, source="llm")
+        else:
+            print(f"Ignoring wrong answers from LLM, expected a json object but got {type(answers).__name__}")
+
+    with open(llm_response_path, 'w', encoding='utf-8') as f:
+        resp = sorted(resp + local_responses, key=lambda item: item['page'])
+        json.dump(resp, f, ensure_ascii=False, indent=4)
+
+    question_type.main(llm_response_path, extracted_data_path, final_output_path, distractors=distractor_service)
+    distractor_service.close()
+
+
+# Guard the pipeline so that extract_all's render workers can re-import this module (spawn start method)
+if __name__ == "__main__":
+    main()
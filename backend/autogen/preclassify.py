@@ -0,0 +1,160 @@
+import json
+import re
+from question_type import THRESHOLD
+
+CONFIDENCE_THRESHOLD = 0.8  # Pages classified with lower confidence are sent to the LLM
+MAX_CAPTION_WORDS = 2  # A caption under a picture has at most this many words per line
+MIN_SENTENCE_WORDS = 3
+MAX_CONTENT_WORDS = 8  # Longer lines are treated as instructions
+# Directions to teachers; only looked for in sentences, as single words like "circle" can be answers
+INSTRUCTION_PATTERN = re.compile(r"\b(copyright|point to|ask (them|the children)|tick the|circle the|"
+                                 r"colou?r the|listen (to|and)|teachers?'?s? notes?)\b", re.IGNORECASE)
+TOKEN_CHARS = 4  # Rough number of characters per LLM token
+
+
+def is_instruction(text):
+    """Headings and directions to teachers are not question content"""
+    text = text.strip()
+    word_count = len(text.split())
+    if text.endswith(":") or word_count > MAX_CONTENT_WORDS:
+        return True
+    return word_count >= MIN_SENTENCE_WORDS and INSTRUCTION_PATTERN.search(text) is not None
+
+
+def is_below(image_coord, text_coord):
+    """Looser version of the rule question_type uses to pair a word with the picture above it"""
+    return text_coord[0] < image_coord[2] and text_coord[2] > image_coord[0] and \
+        image_coord[3] < text_coord[1] and \
+        text_coord[1] - image_coord[3] < THRESHOLD
+
+
+def text_lines(block):
+    """(text, coordinates) of each line of a text block; older extractions only have the block's coordinates"""
+    if block.get('lines'):
+        return [(line['text'].strip(), line['coordinates']) for line in block['lines'] if line['text'].strip()]
+    return [(line.strip(), block['coordinates']) for line in block['text'].split('\n') if line.strip()]
+
+
+def shares_ending(words):
+    """Fraction of words that rhyme (same last two letters) with another word on the page"""
+    endings = [word[-2:].lower() for word in words if len(word) > 2]
+    if len(endings) < 2:
+        return 0.0
+    return sum(1 for ending in endings if endings.count(ending) > 1) / len(endings)
+
+
+def page_features(page):
+    """Layout features of one page of extracted_results.json"""
+    images = [img['coordinates'] for img in page.get('images', []) if img.get('coordinates')]
+
+    blocks = []
+    lines = []
+    captions = []
+    dropped_captions = 0
+    for block in page.get('text_blocks', []):
+        kept = False
+        for text, coordinates in text_lines(block):
+            under_picture = len(text.split()) <= MAX_CAPTION_WORDS and \
+                any(is_below(image, coordinates) for image in images)
+            if is_instruction(text):
+                # Could still be an answer, so it counts against the confidence of a "read images" page
+                dropped_captions += under_picture
+                continue
+            kept = True
+            lines.append(text)
+            if under_picture:
+                captions.append(text)
+        if kept:
+            blocks.append(block)
+
+    letters = [line for line in lines if re.fullmatch(r"[A-Za-z]{1,2}", line)]
+    words = [line for line in lines if re.fullmatch(r"[A-Za-z'-]{3,}", line)]
+    sentences = [line for line in lines if len(line.split()) >= MIN_SENTENCE_WORDS]
+
+    return {
+        'blocks': blocks,
+        'lines': lines,
+        'images': len(images),
+        'letters': len(letters),
+        'words': len(words),
+        'sentences': len(sentences),
+        'captions': captions,
+        'dropped_captions': dropped_captions,
+        'phonetic_cues': '_' in ''.join(lines) or shares_ending(words) >= 0.5,
+    }
+
+
+def classify_page(page):
+    """Return (question_type, confidence, features); question_type is None when unsure"""
+    features = page_features(page)
+    total = len(features['lines'])
+    if not total:
+        return None, 0.0, features
+
+    if features['images']:
+        if features['captions']:
+            return "read images", len(features['captions']) / (total + features['dropped_captions']), features
+        return None, 0.0, features
+
+    # Rhymes and blanked-out letters look like word lists but are phonetic awareness questions
+    if features['phonetic_cues']:
+        return None, 0.0, features
+    if features['letters'] + features['words'] >= features['sentences']:
+        return "read alphabets/words", (features['letters'] + features['words']) / total, features
+    return "read sentences", features['sentences'] / total, features
+
+
+def estimate_tokens(data):
+    return len(str(data)) // TOKEN_CHARS
+
+
+def main(extracted_data_file, llm_preprocess_file, output_file):
+    """Classify pages locally; return (llm_responses for confident pages, pages left for the LLM)"""
+    with open(extracted_data_file, 'r') as file:
+        extraction_results = json.load(file)
+    with open(llm_preprocess_file, 'r') as file:
+        llm_pages = {item['page']: item for item in json.load(file)}
+
+    local_responses = []
+    remaining_pages = []
+    report = []
+    for page in extraction_results:
+        page_num = page['page']
+        if page_num not in llm_pages:
+            continue
+        question_type, confidence, features = classify_page(page)
+        local = question_type is not None and confidence >= CONFIDENCE_THRESHOLD
+
+        if local:
+            # Wrong answers of "read images" pages are filled in later by the distractor service
+            if question_type == "read images":
+                content = [{'right_ans': caption} for caption in features['captions']]
+            else:
+                content = [block['text'] for block in features['blocks']]
+            local_responses.append({
+                'page': page_num,
+                'question_type': question_type,
+                'content': content
+            })
+        else:
+            remaining_pages.append(llm_pages[page_num])
+
+        report.append({
+            'page': page_num,
+            'question_type': question_type,
+            'confidence': round(confidence, 2),
+            'captions': features['captions'],
+            'sent_to_llm': not local
+        })
+
+    skipped_pages = [llm_pages[item['page']] for item in local_responses]
+    saved = {
+        'prompt_tokens': estimate_tokens(skipped_pages) if skipped_pages else 0,
+        'completion_tokens': estimate_tokens(json.dumps(local_responses, ensure_ascii=False)) if local_responses else 0,
+    }
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump({'pages': report, 'saved_tokens': saved}, file, ensure_ascii=False, indent=4)
+
+    print(f"Pre-classified {len(local_responses)}/{len(report)} pages locally, "
+          f"~{saved['prompt_tokens']} prompt and ~{saved['completion_tokens']} completion tokens saved")
+    return local_responses, remaining_pages
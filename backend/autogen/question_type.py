@@ -9,7 +9,7 @@ CONTAIN_IMAGE = {
 }
 THRESHOLD = 50  # Threshold for determining if text is associated with an image
 
-def find_text_image_pairs(page: int, extracted_data: json, llm_response_file: json): 
+def find_text_image_pairs(page: int, extracted_data: json, llm_response_file: json, distractors=None): 
     
     with open(extracted_data, 'r') as file:
         text_data = json.load(file)
@@ -34,8 +34,11 @@ def find_text_image_pairs(page: int, extracted_data: json, llm_response_file: js
             image_links = [img['path'] for img in item['images']]
             image_coordinates = [img['coordinates'] for img in item['images']]
 
-            for text_block in text_blocks:
-                text = text_block['text']
+            # Pair line by line: captions on the same baseline are merged into one text block
+            text_lines = [line for text_block in text_blocks for line in (text_block.get('lines') or [text_block])]
+
+            for text_line in text_lines:
+                text = text_line['text']
 
                 if text not in right_ans and \
                     (text[:-1]) not in right_ans:
@@ -44,12 +47,18 @@ def find_text_image_pairs(page: int, extracted_data: json, llm_response_file: js
                 for item in llm_content:
                     if text == item['right_ans'] or \
                         (text[:-1] == item['right_ans']):
-                        wrong_ans = item['wrong_ans']
+                        wrong_ans = item.get('wrong_ans')
                         break
 
-                text_coordinate = text_block['coordinates']
+                # Pre-classified pages leave wrong answers to the distractor service
+                if not wrong_ans and distractors is not None:
+                    wrong_ans = distractors.get(item['right_ans'])
+
+                text_coordinate = text_line['coordinates']
                 
                 for image_link, image_coord in zip(image_links, image_coordinates):
+                    if not image_coord:
+                        continue
                     if image_coord[0] <= text_coordinate[0] <= image_coord[2] and \
                        image_coord[0] <= text_coordinate[2] <= image_coord[2] and \
                         image_coord[3] < text_coordinate[1] and \
@@ -89,7 +98,7 @@ def get_texts(page_num: int, extracted_data: json, llm_response_file: json):
     return texts
 
 
-def main(llm_response_file, extracted_data_file, final_output_file):
+def main(llm_response_file, extracted_data_file, final_output_file, distractors=None):
     with open(llm_response_file, 'r') as file:
         llm_response = json.load(file)
         file.close()
@@ -103,7 +112,7 @@ def main(llm_response_file, extracted_data_file, final_output_file):
                 pass
             else:
                 if CONTAIN_IMAGE[question_type]:
-                    pairs = find_text_image_pairs(page_num, extracted_data=extracted_data_file, llm_response_file=llm_response_file)
+                    pairs = find_text_image_pairs(page_num, extracted_data=extracted_data_file, llm_response_file=llm_response_file, distractors=distractors)
                     question_dict = {
                         "page": page_num,
                         "question_type": question_type,
@@ -5,6 +5,7 @@ from supabase import create_client
 load_dotenv()
 SUPABASE_URL = os.getenv("VITE_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
+# Legacy HS256 JWT secret; projects using asymmetric signing keys are verified through JWKS instead
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
@@ -0,0 +1,99 @@
+"""Local stand-in for the DeepSeek (OpenAI-compatible) chat completions endpoint
+
+The reply classifies every page of the prompt as "read alphabets/words" and returns
+its text blocks as content, which is enough for question_type.py to produce output.
+Wrong-answer prompts from autogen/distractors.py get made-up variations of each word.
+"""
+import argparse
+import ast
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXTRACTION_MARKER = "The extracted json file is:"
+DISTRACTOR_MARKER = "The words are:"
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def fake_reply(prompt):
+    """Build a plausible llm_response.json (or wrong answers) from the data embedded in the prompt"""
+    if DISTRACTOR_MARKER in prompt:
+        _, _, words = prompt.rpartition(DISTRACTOR_MARKER)
+        try:
+            return json.dumps({word: [word[:-1] + "s", word + "y", "a" + word] for word in json.loads(words)})
+        except ValueError:
+            return "{}"
+
+    _, _, extraction = prompt.rpartition(EXTRACTION_MARKER)
+    try:
+        pages = ast.literal_eval(extraction.strip())
+    except (ValueError, SyntaxError):
+        return "[]"
+    reply = [{
+        "page": page["page"],
+        "question_type": "read alphabets/words",
+        "content": page.get("text_blocks", []),
+    } for page in pages]
+    return json.dumps(reply, ensure_ascii=False)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+        content = fake_reply(prompt)
+
+        # Simulate generation time growing with the number of output tokens
+        completion_tokens = estimate_tokens(content)
+        time.sleep(self.server.latency + completion_tokens * self.server.token_latency)
+
+        payload = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "deepseek-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": completion_tokens,
+                "total_tokens": estimate_tokens(prompt) + completion_tokens,
+            },
+        }
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port, latency=0.0, token_latency=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_latency = token_latency
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every completion")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="Seconds added per generated output token")
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.token_latency)
@@ -0,0 +1,185 @@
+"""Local stand-in for the Supabase auth, storage and REST endpoints used by app.py
+
+Every user can log in with any password and is issued an HS256 access token signed
+with --jwt-secret, so app.py must run with the same SUPABASE_JWT_SECRET.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import jwt
+
+TOKEN_LIFETIME = 3600
+
+
+def make_anon_key(secret):
+    """A JWT-shaped anon key, as create_client expects"""
+    return jwt.encode({"role": "anon", "iss": "supabase"}, secret, algorithm="HS256")
+
+
+class FakeSupabase:
+    """In-memory state shared by all request handlers"""
+
+    def __init__(self, jwt_secret, latency, role, cold_questions):
+        self.jwt_secret = jwt_secret
+        self.latency = latency
+        self.role = role
+        self.cold_questions = cold_questions
+        self.objects = {}  # (bucket, path) -> size
+        self.questions = {}  # (document, page) -> row
+        self.lock = threading.Lock()
+
+    def user(self, email, metadata=None):
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, email)),
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "app_metadata": {"provider": "email"},
+            "user_metadata": metadata or {"role": self.role, "school": "Load Test School", "xp": 0},
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def session(self, user):
+        expires_at = int(time.time()) + TOKEN_LIFETIME
+        claims = {
+            "sub": user["id"],
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": user["email"],
+            "exp": expires_at,
+            "user_metadata": user["user_metadata"],
+        }
+        return {
+            "access_token": jwt.encode(claims, self.jwt_secret, algorithm="HS256"),
+            "token_type": "bearer",
+            "expires_in": TOKEN_LIFETIME,
+            "expires_at": expires_at,
+            "refresh_token": uuid.uuid4().hex,
+            "user": user,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeSupabase/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self, method):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self.read_body()
+
+        if url.path == "/auth/v1/token" and method == "POST":
+            data = json.loads(body or b"{}")
+            return self.send_json(self.state.session(self.state.user(data.get("email", "user@example.com"))))
+        if url.path == "/auth/v1/signup" and method == "POST":
+            data = json.loads(body or b"{}")
+            user = self.state.user(data.get("email", "user@example.com"), data.get("data"))
+            return self.send_json(self.state.session(user))
+
+        if url.path.startswith("/storage/v1/object/list/") and method == "POST":
+            bucket = unquote(url.path[len("/storage/v1/object/list/"):])
+            prefix = json.loads(body or b"{}").get("prefix", "")
+            with self.state.lock:
+                names = [path[len(prefix):].lstrip("/") for (b, path) in self.state.objects
+                         if b == bucket and path.startswith(prefix)]
+            return self.send_json([{"name": name, "id": name, "metadata": {}} for name in names])
+        if url.path.startswith("/storage/v1/object/") and method == "DELETE":
+            bucket = unquote(url.path[len("/storage/v1/object/"):])
+            prefixes = json.loads(body or b"{}").get("prefixes", [])
+            with self.state.lock:
+                removed = [path for path in prefixes if self.state.objects.pop((bucket, path), None) is not None]
+            return self.send_json([{"name": path} for path in removed])
+        if url.path.startswith("/storage/v1/object/") and method in ("POST", "PUT"):
+            key = unquote(url.path[len("/storage/v1/object/"):])
+            bucket, _, path = key.partition("/")
+            with self.state.lock:
+                self.state.objects[(bucket, path)] = len(body)
+            return self.send_json({"Key": key, "Id": str(uuid.uuid4())})
+
+        if url.path == "/rest/v1/homework_questions":
+            return self.homework_questions(method, query, body)
+
+        self.send_json({"error": f"Not implemented: {method} {url.path}"}, status=404)
+
+    def homework_questions(self, method, query, body):
+        document = query.get("document", "").removeprefix("eq.")
+        with self.state.lock:
+            if method == "GET":
+                rows = [] if self.state.cold_questions else sorted(
+                    (row for (doc, _), row in self.state.questions.items() if doc == document),
+                    key=lambda row: row["page"])
+                return self.send_json(rows)
+            if method == "POST":
+                rows = json.loads(body or b"[]")
+                for row in rows if isinstance(rows, list) else [rows]:
+                    self.state.questions[(row["document"], row["page"])] = row
+                return self.send_json([], status=201)
+            if method == "DELETE":
+                after = int(query.get("page", "gt.0").removeprefix("gt."))
+                for key in [key for key in self.state.questions if key[0] == document and key[1] > after]:
+                    del self.state.questions[key]
+                return self.send_json([])
+        self.send_json({"error": "Method not allowed"}, status=405)
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def do_PUT(self):
+        self.route("PUT")
+
+    def do_DELETE(self):
+        self.route("DELETE")
+
+    def do_PATCH(self):
+        self.route("PATCH")
+
+
+def serve(port, jwt_secret, latency=0.0, role="teacher", cold_questions=False):
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.state = FakeSupabase(jwt_secret, latency, role, cold_questions)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Supabase auth/storage/REST server")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--jwt-secret", required=True)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--role", default="teacher", help="Role in the metadata of logged-in users")
+    parser.add_argument("--cold-questions", action="store_true",
+                        help="Never return stored questions, so every PDF request regenerates")
+    args = parser.parse_args()
+    serve(args.port, args.jwt_secret, args.latency, args.role, args.cold_questions)
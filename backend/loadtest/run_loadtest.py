@@ -0,0 +1,326 @@
+"""Load test for the Flask backend against local Supabase and LLM stand-ins
+
+Boots fake_supabase.py, fake_llm.py and app.py in the requested serving modes, then drives
+a weighted mix of login, listing, upload and /process_homework_pdf traffic at increasing
+concurrency. Reports throughput, latency percentiles and peak server memory per stage.
+
+Example:
+    python run_loadtest.py --modes flask gunicorn --workers 1 4 --concurrency 1 8 32
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+from fake_supabase import make_anon_key
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(LOADTEST_DIR)
+AUTOGEN_DIR = os.path.join(BACKEND_DIR, "autogen")
+PDF_FILENAME = "homework.pdf"
+JWT_SECRET = "loadtest-jwt-secret-not-for-production-use"
+DEFAULT_MIX = "login=1,list=6,upload=2,process=1"
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=STARTUP_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and all its descendants (Linux /proc)"""
+    children = defaultdict(list)
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rpartition(")")[2].split()
+            children[int(fields[1])].append(int(entry))
+            rss[int(entry)] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
+
+
+class MemorySampler(threading.Thread):
+    """Track the peak RSS of the server process tree while a stage runs"""
+
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, process_tree_rss(self.pid))
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.peak = max(self.peak, process_tree_rss(self.pid))
+        return self.peak
+
+
+def start_fakes(args):
+    supabase_port, llm_port = free_port(), free_port()
+    supabase_cmd = [sys.executable, os.path.join(LOADTEST_DIR, "fake_supabase.py"),
+                    "--port", str(supabase_port), "--jwt-secret", JWT_SECRET,
+                    "--latency", str(args.supabase_latency)]
+    if args.cold_questions:
+        supabase_cmd.append("--cold-questions")
+    llm_cmd = [sys.executable, os.path.join(LOADTEST_DIR, "fake_llm.py"),
+               "--port", str(llm_port), "--latency", str(args.llm_latency),
+               "--token-latency", str(args.llm_token_latency)]
+    processes = [subprocess.Popen(supabase_cmd), subprocess.Popen(llm_cmd)]
+    wait_for_port(supabase_port)
+    wait_for_port(llm_port)
+    return processes, supabase_port, llm_port
+
+
+def start_app(mode, workers, threads, supabase_port, llm_port, preclassify=True):
+    port = free_port()
+    env = dict(
+        os.environ,
+        VITE_SUPABASE_URL=f"http://127.0.0.1:{supabase_port}",
+        VITE_SUPABASE_ANON_KEY=make_anon_key(JWT_SECRET),
+        SUPABASE_JWT_SECRET=JWT_SECRET,
+        DEEPSEEK_BASE_URL=f"http://127.0.0.1:{llm_port}",
+        DEEPSEEK_API_KEY="loadtest",
+        PRECLASSIFY="1" if preclassify else "0",
+    )
+    if mode == "flask":
+        cmd = [sys.executable, "-c",
+               f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"]
+    elif mode == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--threads", str(threads),
+               "--bind", f"127.0.0.1:{port}", "--timeout", "300", "--log-level", "warning", "app:app"]
+    else:
+        raise ValueError(f"Unknown serving mode: {mode}")
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class Client:
+    """One simulated user: logs in once, then issues requests from the mix"""
+
+    def __init__(self, base_url, index, pdf_bytes):
+        self.http = httpx.Client(base_url=base_url, timeout=300)
+        self.email = f"loadtest-{index}@example.com"
+        self.pdf_bytes = pdf_bytes
+        self.token = None
+        self.uploads = 0
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def login(self):
+        response = self.http.post("/login", json={"email": self.email, "password": "loadtest"})
+        if response.status_code == 200:
+            self.token = response.json()["access_token"]
+        return response
+
+    def list(self):
+        return self.http.get(random.choice(["/get_pdfs", "/get_images", "/get_videos"]))
+
+    def upload(self):
+        self.uploads += 1
+        filename = f"{self.email}-{self.uploads}.pdf"
+        return self.http.post("/upload_pdf", headers=self.headers(),
+                              files={"file": (filename, self.pdf_bytes, "application/pdf")})
+
+    def process(self):
+        return self.http.post("/process_homework_pdf", headers=self.headers(),
+                              json={"pdf_filename": PDF_FILENAME})
+
+    def close(self):
+        self.http.close()
+
+
+def run_stage(base_url, concurrency, duration, mix, pdf_bytes):
+    """Run `concurrency` clients for `duration` seconds; return a list of (op, seconds, ok)"""
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    ops, weights = zip(*mix.items())
+
+    def worker(index):
+        client = Client(base_url, index, pdf_bytes)
+        local = []
+        op = "login"
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    ok = getattr(client, op)().status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                local.append((op, time.perf_counter() - start, ok))
+                op = random.choices(ops, weights)[0] if client.token else "login"
+        finally:
+            client.close()
+            with lock:
+                samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    def stats(subset):
+        latencies = sorted(seconds for _, seconds, _ in subset)
+        return {
+            "requests": len(subset),
+            "errors": sum(1 for _, _, ok in subset if not ok),
+            "rps": len(subset) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+    by_op = defaultdict(list)
+    for sample in samples:
+        by_op[sample[0]].append(sample)
+    return {"total": stats(samples), "ops": {op: stats(subset) for op, subset in sorted(by_op.items())}}
+
+
+def print_row(label, stats, rss=None):
+    memory = f"{rss / 2**20:9.1f}" if rss is not None else " " * 9
+    print(f"{label:<34}{stats['requests']:>8}{stats['errors']:>7}{stats['rps']:>9.1f}"
+          f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}{memory}")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        if op not in ("login", "list", "upload", "process"):
+            raise argparse.ArgumentTypeError(f"Unknown operation in mix: {op}")
+        mix[op] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["flask"], choices=["flask", "gunicorn"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1], help="gunicorn worker counts")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency stage")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted operations (default: {DEFAULT_MIX})")
+    parser.add_argument("--supabase-latency", type=float, default=0.02, help="Seconds per Supabase call")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds per LLM completion")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="Seconds per LLM output token")
+    parser.add_argument("--cold-questions", action="store_true",
+                        help="Regenerate questions on every /process_homework_pdf call")
+    parser.add_argument("--no-preclassify", action="store_true",
+                        help="Send every page to the fake LLM instead of classifying obvious pages locally")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with open(os.path.join(AUTOGEN_DIR, PDF_FILENAME), "rb") as f:
+        pdf_bytes = f.read()
+
+    fakes, supabase_port, llm_port = start_fakes(args)
+    report = []
+    try:
+        for mode in args.modes:
+            # The Flask development server is a single process, worker counts only apply to gunicorn
+            for workers in (args.workers if mode == "gunicorn" else [1]):
+                app_process, base_url = start_app(mode, workers, args.threads, supabase_port, llm_port,
+                                                  preclassify=not args.no_preclassify)
+                try:
+                    # Generate the question bank once so concurrent requests measure the stored path
+                    warmup = Client(base_url, "warmup", pdf_bytes)
+                    warmup.login()
+                    warmup.process()
+                    warmup.close()
+
+                    print(f"\n== {mode}, {workers} worker(s), mix {args.mix}")
+                    print(f"{'stage':<34}{'reqs':>8}{'errors':>7}{'rps':>9}{'p50 ms':>9}"
+                          f"{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'peak MB':>9}")
+                    for concurrency in args.concurrency:
+                        sampler = MemorySampler(app_process.pid)
+                        sampler.start()
+                        samples, elapsed = run_stage(base_url, concurrency, args.duration, args.mix, pdf_bytes)
+                        peak_rss = sampler.stop()
+
+                        summary = summarize(samples, elapsed)
+                        print_row(f"concurrency {concurrency}", summary["total"], peak_rss)
+                        for op, stats in summary["ops"].items():
+                            print_row(f"  {op}", stats)
+                        report.append({
+                            "mode": mode,
+                            "workers": workers,
+                            "concurrency": concurrency,
+                            "duration": elapsed,
+                            "peak_rss_bytes": peak_rss,
+                            **summary,
+                        })
+                finally:
+                    stop(app_process)
+    finally:
+        for process in fakes:
+            stop(process)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import hashlib
+import mimetypes
+import os
+from datetime import datetime, timezone
+
+import fitz  # PyMuPDF
+from config import supabase
+
+# Generated questions are stored one row per (document, page)
+QUESTION_TABLE = 'homework_questions'
+# Pictures of generated questions are served from the same bucket as the uploaded documents
+IMAGE_BUCKET = 'docs'
+IMAGE_FOLDER = 'questions'
+
+
+def page_fingerprints(pdf_path):
+    """Hash each page's content, keyed by 1-based page number"""
+    doc = fitz.open(pdf_path)
+    fingerprints = {}
+    for page in doc:
+        digest = hashlib.sha256()
+        digest.update(str(page.rect).encode())
+        digest.update(page.read_contents())
+        # Text drawn through form XObjects is not in the page's own content stream
+        digest.update(page.get_text().encode('utf-8'))
+        for img in page.get_images():
+            digest.update(doc.xref_stream_raw(img[0]) or b'')
+        fingerprints[page.number + 1] = digest.hexdigest()
+    doc.close()
+    return fingerprints
+
+
+def load_pages(document):
+    """Return the stored rows of a document, keyed by page number"""
+    response = supabase.table(QUESTION_TABLE) \
+        .select('page, fingerprint, question') \
+        .eq('document', document) \
+        .order('page') \
+        .execute()
+    return {row['page']: row for row in response.data}
+
+
+def changed_pages(stored, fingerprints):
+    """Pages that are new or whose fingerprint differs from the stored one"""
+    return [page for page, fingerprint in fingerprints.items()
+            if page not in stored or stored[page]['fingerprint'] != fingerprint]
+
+
+def save_pages(document, fingerprints, questions, pages):
+    """Upsert the generated question (or None) of each page in `pages`"""
+    updated_at = datetime.now(timezone.utc).isoformat()
+    rows = [{
+        'document': document,
+        'page': page,
+        'fingerprint': fingerprints[page],
+        'question': questions.get(page),
+        'updated_at': updated_at,
+    } for page in pages]
+    if rows:
+        supabase.table(QUESTION_TABLE).upsert(rows, on_conflict='document,page').execute()
+    return rows
+
+
+def upload_question_images(document, fingerprints, questions):
+    """Upload the pictures of generated questions and replace their local paths by public URLs"""
+    bucket = supabase.storage.from_(IMAGE_BUCKET)
+    stem = os.path.splitext(os.path.basename(document))[0]
+    uploaded = {}
+    for page, question in questions.items():
+        for pair in question.get('text_image_pairs', []):
+            local_path = pair['image_link']
+            if local_path not in uploaded:
+                # A new folder per page version, so an edited page never shows a cached old picture
+                path = f"{IMAGE_FOLDER}/{stem}/{fingerprints[page]}/{os.path.basename(local_path)}"
+                content_type = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+                with open(local_path, 'rb') as f:
+                    bucket.upload(path, f.read(), {'content-type': content_type, 'upsert': 'true'})
+                uploaded[local_path] = bucket.get_public_url(path)
+            pair['image_link'] = uploaded[local_path]
+
+
+def delete_question_images(rows):
+    """Remove the uploaded pictures of stored rows that are replaced or dropped"""
+    marker = f"/object/public/{IMAGE_BUCKET}/"
+    paths = {pair['image_link'].partition(marker)[2].split('?')[0]
+             for row in rows if row.get('question')
+             for pair in row['question'].get('text_image_pairs', [])
+             if marker in pair.get('image_link', '')}
+    if paths:
+        supabase.storage.from_(IMAGE_BUCKET).remove(sorted(paths))
+
+
+def delete_pages_after(document, page_count):
+    """Drop the rows of pages removed from an edited PDF"""
+    supabase.table(QUESTION_TABLE) \
+        .delete() \
+        .eq('document', document) \
+        .gt('page', page_count) \
+        .execute()
+
+
+def stored_questions(stored):
+    """Questions of the stored rows in page order, skipping pages without a question"""
+    return [stored[page]['question'] for page in sorted(stored) if stored[page]['question']]
@@ -165,9 +165,13 @@ const Homework = () => {
     setShowGeneratedQuestions(false);
     console.log('Processing PDF:', pdfFilename);
     try {
+      const { data: { session } } = await supabase.auth.getSession();
       const res = await fetch('http://127.0.0.1:5000/process_homework_pdf', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${session?.access_token ?? ''}`,
+        },
         body: JSON.stringify({ pdf_filename: pdfFilename }),
       });
       const data = await res.json();